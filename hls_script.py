@@ -1,15 +1,167 @@
 import os
-import re
+import json
+import hashlib
+import functools
+import mmap
+import string
 import subprocess
 import tempfile
 from pathlib import Path
 import shutil
+import signal
 import sys
 import time
+import threading
 
+# 综合结果缓存目录
+CACHE_DIR = Path.home() / ".cache" / "hls_eval"
+
+# HLS工程TCL脚本模板，reset为" -reset"时重建工程
+TCL_TEMPLATE = string.Template("""
+# Project settings
+open_project${reset} ${top}_prj
+add_files ${src}
+set_top ${top}
+
+# Create solution
+open_solution${reset} "solution1"
+set_part {${device}}
+create_clock -period ${period} -name default
+
+# Synthesis process
+csynth_design
+
+exit
+""")
+
+# 综合结束后等待报告文件出现的最长时间（秒）
+REPORT_WAIT_TIMEOUT = 0.5
+
+# 报告中各节的起始标记，按出现顺序排列：Timing -> Latency -> Utilization
+_SECTION_ANCHORS = [b"== Performance Estimates", b"+ Latency (clock cycles)", b"== Utilization Estimates"]
+
+# 资源利用率表中需要提取的行及对应的结果字段
+_UTIL_ROWS = {
+    "Total": "resources",
+    "Available": "available",
+    "Utilization (%)": "utilization_percentage",
+}
+_RESOURCE_NAMES = ["BRAM", "DSP", "FF", "LUT", "URAM"]
+
+# print_result中utilization各部分的标题
+_UTIL_TITLES = [
+    ("resources", "Resources"),
+    ("available", "Available Resources"),
+    ("utilization_percentage", "Utilization Percentage"),
+]
+
+def _safe_convert(value_str):
+    """
+    安全地转换数值，处理"?"的情况，无法转换时原样返回
+    """
+    value_str = value_str.strip()
+    if value_str == "?":
+        return "?"
+    try:
+        return int(value_str)
+    except ValueError:
+        try:
+            return float(value_str)
+        except ValueError:
+            return value_str
+
+def _safe_resource_convert(value_str):
+    """
+    安全地转换资源值，"-"视为0
+    """
+    value_str = value_str.strip()
+    if value_str == "-":
+        return 0
+    return _safe_convert(value_str)
+
+def _split_report_sections(content) -> list:
+    """
+    按_SECTION_ANCHORS的顺序定位报告各节，返回解码后的文本片段
+    :param content: 报告文件的字节内容（bytes或mmap）
+    :return: [timing片段, latency片段, utilization片段]，找不到的节为空字符串
+    """
+    offsets = []
+    pos = 0
+    for anchor in _SECTION_ANCHORS:
+        idx = content.find(anchor, pos)
+        offsets.append(idx)
+        if idx != -1:
+            pos = idx
+    
+    blocks = []
+    for i, start in enumerate(offsets):
+        if start == -1:
+            blocks.append("")
+            continue
+        end = next((o for o in offsets[i + 1:] if o != -1), len(content))
+        blocks.append(content[start:end].decode("utf-8", errors="replace"))
+    return blocks
+
+def _first_table_row(block: str) -> list:
+    """
+    提取片段中第一个表格的首行数据（表头之后、第二条分隔线之后的第一行）
+    :param block: 报告片段
+    :return: 去除空白后的单元格列表，找不到时返回None
+    """
+    separators = 0
+    for line in block.splitlines():
+        line = line.strip()
+        if line.startswith("+-"):
+            separators += 1
+        elif line.startswith("|") and separators == 2:
+            return [c.strip() for c in line.split("|")[1:-1]]
+    return None
+
+def _parse_util_table(content: str) -> dict:
+    """
+    逐行解析报告中的Utilization Estimates汇总表
+    :param content: 报告文件内容
+    :return: 包含resources/available/utilization_percentage的字典（只含找到的行）
+    """
+    utilization = {}
+    start = content.find("== Utilization Estimates")
+    if start == -1:
+        return utilization
+    end = content.find("+ Detail", start)
+    block = content[start:end] if end != -1 else content[start:]
+    
+    for line in block.splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            continue
+        cells = [c.strip() for c in line.split("|")[1:-1]]
+        key = _UTIL_ROWS.get(cells[0]) if cells else None
+        if key is None or len(cells) < 6:
+            continue
+        if key == "utilization_percentage":
+            values = cells[1:6]
+        else:
+            values = [_safe_resource_convert(c) for c in cells[1:6]]
+        utilization[key] = dict(zip(_RESOURCE_NAMES, values))
+    
+    return utilization
+
+def _read_log_tail(log_file, size: int = 8192) -> str:
+    """
+    读取日志文件末尾的内容
+    :param log_file: 日志文件路径
+    :param size: 读取的最大字节数
+    :return: 日志末尾的文本
+    """
+    with open(log_file, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - size))
+        return f.read().decode("utf-8", errors="replace")
+
+@functools.lru_cache(maxsize=1)
 def find_vivado_hls():
     """
-    尝试自动查找Vivado HLS的安装路径
+    尝试自动查找Vivado HLS的安装路径（结果在进程内缓存）
     """
     # 常见的Vivado HLS安装路径
     common_paths = [
@@ -25,351 +177,522 @@ def find_vivado_hls():
             return path
     
     # 检查环境变量
-    try:
-        result = subprocess.run(["where", "vivado_hls"], check=True, capture_output=True, text=True)
-        return result.stdout.strip()
-    except subprocess.CalledProcessError:
-        pass
-    
-    return None
+    return shutil.which("vivado_hls")
 
-def hls_evaluation(code_str: str, top_function: str = "top", target_device: str = "xczu7ev-ffvc1156-2-e", 
-                  clock_period: float = 5.0, vivado_hls_path: str = None) -> dict:
+def prepare_project(code_str: str, top_function: str, build_dir, target_device: str = "xczu7ev-ffvc1156-2-e",
+                    clock_period: float = 5.0, reset: bool = True, header_files: dict = None) -> Path:
     """
-    HLS代码性能评估函数
-    :param code_str: 输入的C/C++代码字符串
+    在构建目录中生成HLS源代码文件和TCL脚本
+    :param code_str: 输入的C/C++代码字符串，为None时只重新生成TCL脚本（如扫描时钟周期）
     :param top_function: 顶层函数名称
+    :param build_dir: 构建目录
     :param target_device: 目标FPGA型号
     :param clock_period: 时钟周期(ns)
-    :param vivado_hls_path: Vivado HLS可执行文件的路径，如果为None则尝试自动查找
-    :return: 包含性能和资源消耗的字典
+    :param reset: 是否使用-reset重建工程和solution
+    :param header_files: 头文件字典，格式为 {"文件名": "文件内容"}，写入源文件所在目录
+    :return: TCL脚本路径
     """
-    # 如果未指定Vivado HLS路径，尝试自动查找
-    if vivado_hls_path is None:
-        vivado_hls_path = find_vivado_hls()
-        if vivado_hls_path:
-            print(f"找到Vivado HLS: {vivado_hls_path}")
-        else:
-            return {
-                "error": "找不到vivado_hls命令。请指定Vivado HLS的安装路径或将其添加到系统PATH中。",
-                "raw_log": "Command 'vivado_hls' not found"
-            }
-    
-    # 创建build目录
-    build_dir = Path(os.getcwd()) / "build"
-    if build_dir.exists():
-        shutil.rmtree(build_dir)
-    build_dir.mkdir(exist_ok=True)
+    build_dir = Path(build_dir)
     
     # 1. 生成HLS源代码文件
     src_file = build_dir / f"{top_function}.cpp"
-    with open(src_file, "w", encoding="utf-8") as f:
-        f.write(code_str)
+    if code_str is not None:
+        src_file.write_text(code_str, encoding="utf-8")
+    if header_files:
+        for filename, content in header_files.items():
+            (build_dir / filename).write_text(content, encoding="utf-8")
     
-    # 2. 生成TCL自动化脚本 - 修正TCL脚本，简化报告处理
-    tcl_script = """
-# Project settings
-open_project -reset {0}_prj
-add_files {1}
-set_top {0}
-
-# Create solution
-open_solution -reset "solution1"
-set_part {{{2}}}
-create_clock -period {3} -name default
-
-# Synthesis process
-csynth_design
-
-exit
-""".format(top_function, src_file.name, target_device, clock_period)
+    # 2. 生成TCL自动化脚本
+    tcl_script = TCL_TEMPLATE.substitute(
+        top=top_function,
+        src=src_file.name,
+        device=target_device,
+        period=clock_period,
+        reset=" -reset" if reset else ""
+    )
 
     tcl_file = build_dir / "run.tcl"
     print(f"TCL脚本路径: {tcl_file}")
-    with open(tcl_file, "w", encoding="utf-8") as f:
-        f.write(tcl_script)
+    tcl_file.write_text(tcl_script, encoding="utf-8")
+    return tcl_file
 
-    # 3. 执行Vivado HLS
-    try:
-        print(f"执行命令: {vivado_hls_path} -f {str(tcl_file)}")
+def _synth_command(vivado_hls_path: str, tcl_file) -> list:
+    """
+    生成Vivado HLS命令行
+    控制台输出已完整写入build目录下的vivado_hls.log，因此将工具自身的日志重定向到空设备，
+    避免两个写者同时写同名日志文件
+    """
+    return [vivado_hls_path, "-l", os.devnull, "-f", str(tcl_file)]
+
+def run_synth(tcl_file, vivado_hls_path: str, build_dir) -> int:
+    """
+    执行Vivado HLS综合，输出写入构建目录下的vivado_hls.log
+    :param tcl_file: TCL脚本路径
+    :param vivado_hls_path: Vivado HLS可执行文件的路径
+    :param build_dir: 构建目录
+    :return: Vivado HLS进程的返回码
+    """
+    tcl_file = Path(tcl_file).resolve()
+    cmd = _synth_command(vivado_hls_path, tcl_file)
+    print(f"执行命令: {' '.join(cmd)}")
+    # stdout和stderr合并后由子进程直接写入日志文件，Python端不经过管道也不做解码
+    with open(Path(build_dir) / "vivado_hls.log", "wb") as logf:
         proc = subprocess.run(
-            [vivado_hls_path, "-f", str(tcl_file)],
+            cmd,
             cwd=str(build_dir),
-            capture_output=True,
-            text=True
+            stdin=subprocess.DEVNULL,
+            stdout=logf,
+            stderr=subprocess.STDOUT
         )
-        
-        # 保存日志
-        with open(build_dir / "vivado_hls.log", "w", encoding="utf-8") as f:
-            f.write(proc.stdout)
-            if proc.stderr:
-                f.write("\n\nSTDERR:\n")
-                f.write(proc.stderr)
-        
-        # 4. 检查执行结果
-        if proc.returncode != 0:
-            return {
-                "error": f"HLS synthesis failed: {proc.stderr[-500:] if proc.stderr else proc.stdout[-500:]}",
-                "raw_log": proc.stderr if proc.stderr else proc.stdout
-            }
+    return proc.returncode
 
-        # 5. 解析报告文件
-        def parse_reports():
-            # 查找报告文件
-            report_file = None
-            report_dir = build_dir / f"{top_function}_prj" / "solution1" / "syn" / "report"
+def parse_report(build_dir, top_function: str) -> dict:
+    """
+    查找并解析综合报告
+    :param build_dir: 构建目录
+    :param top_function: 顶层函数名称
+    :return: 包含timing/latency/utilization的字典，出错时包含error字段
+    """
+    # 查找报告文件
+    report_file = None
+    report_dir = Path(build_dir) / f"{top_function}_prj" / "solution1" / "syn" / "report"
+    potential_report = report_dir / f"{top_function}_csynth.rpt"
+    
+    # Vivado HLS退出前已写出报告，这里只留很短的宽限期以应对文件系统延迟
+    deadline = time.monotonic() + REPORT_WAIT_TIMEOUT
+    while True:
+        if potential_report.exists():
+            report_file = potential_report
+            break
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(0.05)
+    
+    if not report_file:
+        print(f"找不到报告文件: {report_dir / f'{top_function}_csynth.rpt'}")
+        # 尝试列出报告目录中的文件
+        if report_dir.exists():
+            print(f"报告目录中的文件: {list(report_dir.glob('*'))}")
+        return {
+            "error": "找不到报告文件",
+            "timing": {},
+            "latency": {},
+            "utilization": {}
+        }
+    
+    print(f"找到报告文件: {report_file}")
+    
+    try:
+        # 内存映射报告文件，只解码需要解析的片段
+        with open(report_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # 创建结果字典
+            report_results = {
+                "timing": {},
+                "latency": {},
+                "utilization": {
+                    "resources": {},
+                    "utilization_percentage": {}
+                }
+            }
+            
+            # 一次定位各节位置，后续只在对应片段内搜索
+            timing_block, latency_block, util_block = _split_report_sections(mm)
             
-            # 等待报告文件生成（最多等待5秒）
-            max_wait = 3
-            wait_time = 0
-            while wait_time < max_wait:
-                if report_dir.exists():
-                    potential_report = report_dir / f"{top_function}_csynth.rpt"
-                    if potential_report.exists():
-                        report_file = potential_report
-                        break
-                time.sleep(1)
-                wait_time += 1
-                print(f"等待报告文件生成... {wait_time}/{max_wait}")
+            # 解析Timing信息
+            timing_row = _first_table_row(timing_block)
             
-            if not report_file or not report_file.exists():
-                print(f"找不到报告文件: {report_dir / f'{top_function}_csynth.rpt'}")
-                # 尝试列出报告目录中的文件
-                if report_dir.exists():
-                    print(f"报告目录中的文件: {list(report_dir.glob('*'))}")
-                return {
-                    "error": "找不到报告文件",
-                    "timing": {},
-                    "latency": {},
-                    "utilization": {}
+            if timing_row and len(timing_row) >= 4:
+                report_results["timing"] = {
+                    "clock": timing_row[0],
+                    "target": float(timing_row[1]),
+                    "estimated": float(timing_row[2]),
+                    "uncertainty": float(timing_row[3])
                 }
             
-            print(f"找到报告文件: {report_file}")
+            # 解析Latency信息 - 修改以处理"?"值
+            latency_row = _first_table_row(latency_block)
             
-            try:
-                with open(report_file, "r") as f:
-                    content = f.read()
-                    
-                    # 保存报告内容以便调试
-                    debug_file = os.path.join(build_dir, "report_content.txt")
-                    with open(debug_file, "w") as debug_f:
-                        debug_f.write(content)
-                    
-                    # 创建结果字典
-                    report_results = {
-                        "timing": {},
-                        "latency": {},
-                        "utilization": {
-                            "resources": {},
-                            "utilization_percentage": {}
-                        }
-                    }
-                    
-                    # 解析Timing信息
-                    timing_section = re.search(r"== Performance Estimates\s+=+\s+\+ Timing \(ns\):\s+\* Summary:\s+\+--------\+-------\+----------\+------------\+\s+\|  Clock \| Target\| Estimated\| Uncertainty\|\s+\+--------\+-------\+----------\+------------\+\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\+--------\+-------\+----------\+------------\+", content)
-                    
-                    if timing_section:
-                        report_results["timing"] = {
-                            "clock": timing_section.group(1).strip(),
-                            "target": float(timing_section.group(2).strip()),
-                            "estimated": float(timing_section.group(3).strip()),
-                            "uncertainty": float(timing_section.group(4).strip())
-                        }
-                    
-                    # 解析Latency信息 - 修改以处理"?"值
-                    latency_section = re.search(r"\+ Latency \(clock cycles\):\s+\* Summary:\s+\+-----+\+-----+\+-----+\+-----+\+---------\+\s+\|  Latency  \|  Interval \| Pipeline\|\s+\| min \| max \| min \| max \|   Type  \|\s+\+-----+\+-----+\+-----+\+-----+\+---------\+\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\+-----+\+-----+\+-----+\+-----+\+---------\+", content)
-                    
-                    if latency_section:
-                        # 安全地转换值，处理"?"的情况
-                        def safe_convert(value_str):
-                            value_str = value_str.strip()
-                            if value_str == "?":
-                                return "?"
-                            try:
-                                return int(value_str)
-                            except ValueError:
-                                try:
-                                    return float(value_str)
-                                except ValueError:
-                                    return value_str
-                        
-                        report_results["latency"] = {
-                            "min": safe_convert(latency_section.group(1).strip()),
-                            "max": safe_convert(latency_section.group(2).strip()),
-                            "interval_min": safe_convert(latency_section.group(3).strip()),
-                            "interval_max": safe_convert(latency_section.group(4).strip()),
-                            "pipeline_type": latency_section.group(5).strip()
-                        }
-                    
-                    # 解析Utilization信息
-                    utilization_section = re.search(r"== Utilization Estimates\s+=+\s+\* Summary:\s+\+-----------------\+---------\+-------\+--------\+--------\+-----\+\s+\|       Name      \| BRAM_18K\| DSP48E\|   FF   \|   LUT  \| URAM\|\s+\+-----------------\+---------\+-------\+--------\+--------\+-----\+\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\+-----------------\+---------\+-------\+--------\+--------\+-----\+\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\+-----------------\+---------\+-------\+--------\+--------\+-----\+\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\+-----------------\+---------\+-------\+--------\+--------\+-----\+\s+\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|([^|]+)\|\s+\+-----------------\+---------\+-------\+--------\+--------\+-----\+", content)
-                    
-                    if utilization_section:
-                        # 找到Total, Available和Utilization行的索引
-                        total_idx = 0
-                        available_idx = 0
-                        utilization_idx = 0
-                        
-                        for i in range(1, 10):  # 扩大搜索范围
-                            group_idx = i * 6 + 1
-                            if group_idx < len(utilization_section.groups()) and "Total" in utilization_section.group(group_idx):
-                                total_idx = i
-                            elif group_idx < len(utilization_section.groups()) and "Available" in utilization_section.group(group_idx):
-                                available_idx = i
-                            elif group_idx < len(utilization_section.groups()) and "Utilization" in utilization_section.group(group_idx):
-                                utilization_idx = i
-                        
-                        # 安全地转换资源值
-                        def safe_resource_convert(value_str):
-                            value_str = value_str.strip()
-                            if value_str == "?":
-                                return "?"
-                            elif value_str == "-":
-                                return 0
-                            try:
-                                return int(value_str)
-                            except ValueError:
-                                try:
-                                    return float(value_str)
-                                except ValueError:
-                                    return value_str
-                        
-                        if total_idx > 0:
-                            report_results["utilization"]["resources"] = {
-                                "BRAM": safe_resource_convert(utilization_section.group(total_idx * 6 + 2).strip()),
-                                "DSP": safe_resource_convert(utilization_section.group(total_idx * 6 + 3).strip()),
-                                "FF": safe_resource_convert(utilization_section.group(total_idx * 6 + 4).strip()),
-                                "LUT": safe_resource_convert(utilization_section.group(total_idx * 6 + 5).strip()),
-                                "URAM": safe_resource_convert(utilization_section.group(total_idx * 6 + 6).strip())
-                            }
-                        
-                        if available_idx > 0:
-                            report_results["utilization"]["available"] = {
-                                "BRAM": safe_resource_convert(utilization_section.group(available_idx * 6 + 2).strip()),
-                                "DSP": safe_resource_convert(utilization_section.group(available_idx * 6 + 3).strip()),
-                                "FF": safe_resource_convert(utilization_section.group(available_idx * 6 + 4).strip()),
-                                "LUT": safe_resource_convert(utilization_section.group(available_idx * 6 + 5).strip()),
-                                "URAM": safe_resource_convert(utilization_section.group(available_idx * 6 + 6).strip())
-                            }
-                        
-                        if utilization_idx > 0:
-                            report_results["utilization"]["utilization_percentage"] = {
-                                "BRAM": utilization_section.group(utilization_idx * 6 + 2).strip(),
-                                "DSP": utilization_section.group(utilization_idx * 6 + 3).strip(),
-                                "FF": utilization_section.group(utilization_idx * 6 + 4).strip(),
-                                "LUT": utilization_section.group(utilization_idx * 6 + 5).strip(),
-                                "URAM": utilization_section.group(utilization_idx * 6 + 6).strip()
-                            }
-                    
-                    # 如果正则表达式匹配失败，尝试使用更简单的方法提取关键信息
-                    if not timing_section and not latency_section and not utilization_section:
-                        print("警告：无法使用正则表达式解析报告文件，尝试使用简单方法提取信息")
-                        
-                        # 简单提取Timing信息
-                        if "Timing (ns)" in content:
-                            timing_lines = content.split("Timing (ns)")[1].split("* Summary:")[1].split("\n")
-                            for line in timing_lines:
-                                if "|" in line and "Clock" not in line and "---" not in line:
-                                    parts = line.split("|")
-                                    if len(parts) >= 5:
-                                        report_results["timing"] = {
-                                            "clock": parts[1].strip(),
-                                            "target": float(parts[2].strip()),
-                                            "estimated": float(parts[3].strip()),
-                                            "uncertainty": float(parts[4].strip())
-                                        }
-                                        break
-                        
-                        # 简单提取Latency信息
-                        if "Latency (clock cycles)" in content:
-                            latency_lines = content.split("Latency (clock cycles)")[1].split("* Summary:")[1].split("\n")
-                            for i, line in enumerate(latency_lines):
-                                if "|" in line and "min" not in line and "---" not in line:
-                                    parts = line.split("|")
-                                    if len(parts) >= 7:
-                                        report_results["latency"] = {
-                                            "min": safe_convert(parts[1].strip()),
-                                            "max": safe_convert(parts[2].strip()),
-                                            "interval_min": safe_convert(parts[3].strip()),
-                                            "interval_max": safe_convert(parts[4].strip()),
-                                            "pipeline_type": parts[5].strip()
-                                        }
-                                        break
-                        
-                        # 简单提取Utilization信息
-                        if "Utilization Estimates" in content:
-                            util_lines = content.split("Utilization Estimates")[1].split("* Summary:")[1].split("\n")
-                            total_line = None
-                            available_line = None
-                            utilization_line = None
-                            
-                            for line in util_lines:
-                                if "|" in line:
-                                    if "Total" in line:
-                                        total_line = line
-                                    elif "Available" in line:
-                                        available_line = line
-                                    elif "Utilization" in line:
-                                        utilization_line = line
-                            
-                            if total_line and available_line and utilization_line:
-                                total_parts = total_line.split("|")
-                                available_parts = available_line.split("|")
-                                utilization_parts = utilization_line.split("|")
-                                
-                                if len(total_parts) >= 6 and len(available_parts) >= 6 and len(utilization_parts) >= 6:
-                                    report_results["utilization"]["resources"] = {
-                                        "BRAM": safe_resource_convert(total_parts[2].strip()),
-                                        "DSP": safe_resource_convert(total_parts[3].strip()),
-                                        "FF": safe_resource_convert(total_parts[4].strip()),
-                                        "LUT": safe_resource_convert(total_parts[5].strip()),
-                                        "URAM": safe_resource_convert(total_parts[6].strip() if len(total_parts) > 6 else "0")
-                                    }
-                                    
-                                    report_results["utilization"]["available"] = {
-                                        "BRAM": safe_resource_convert(available_parts[2].strip()),
-                                        "DSP": safe_resource_convert(available_parts[3].strip()),
-                                        "FF": safe_resource_convert(available_parts[4].strip()),
-                                        "LUT": safe_resource_convert(available_parts[5].strip()),
-                                        "URAM": safe_resource_convert(available_parts[6].strip() if len(available_parts) > 6 else "0")
-                                    }
-                                    
-                                    report_results["utilization"]["utilization_percentage"] = {
-                                        "BRAM": utilization_parts[2].strip(),
-                                        "DSP": utilization_parts[3].strip(),
-                                        "FF": utilization_parts[4].strip(),
-                                        "LUT": utilization_parts[5].strip(),
-                                        "URAM": utilization_parts[6].strip() if len(utilization_parts) > 6 else "0%"
-                                    }
-                    
-                    return report_results
-            except Exception as e:
-                print(f"解析报告文件时出错: {str(e)}")
-                return {
-                    "error": f"解析报告文件时出错: {str(e)}",
-                    "timing": {},
-                    "latency": {},
-                    "utilization": {}
+            if latency_row and len(latency_row) >= 5:
+                report_results["latency"] = {
+                    "min": _safe_convert(latency_row[0]),
+                    "max": _safe_convert(latency_row[1]),
+                    "interval_min": _safe_convert(latency_row[2]),
+                    "interval_max": _safe_convert(latency_row[3]),
+                    "pipeline_type": latency_row[4]
                 }
+            
+            # 解析Utilization信息
+            report_results["utilization"].update(_parse_util_table(util_block))
+            
+            return report_results
+    except Exception as e:
+        print(f"解析报告文件时出错: {str(e)}")
+        return {
+            "error": f"解析报告文件时出错: {str(e)}",
+            "timing": {},
+            "latency": {},
+            "utilization": {}
+        }
+
+def _vivado_not_found() -> dict:
+    """
+    找不到Vivado HLS时返回的错误结果
+    """
+    return {
+        "error": "找不到vivado_hls命令。请指定Vivado HLS的安装路径或将其添加到系统PATH中。",
+        "raw_log": "Command 'vivado_hls' not found"
+    }
+
+def _is_build_dir(path: Path) -> bool:
+    """
+    判断目录是否为本模块创建的构建目录（包含TCL脚本或HLS工程），只有这类目录才允许整体删除
+    """
+    return (path / "run.tcl").exists() or any(path.glob("*_prj"))
 
-        # 6. 返回结果
-        report_results = parse_reports()
-        
+def _prepare_job(code_str: str, top_function: str, target_device: str, clock_period: float,
+                 vivado_hls_path: str, build_dir: str, force_rebuild: bool, reuse_project: bool,
+                 header_files: dict = None) -> tuple:
+    """
+    综合前的准备工作：查找Vivado HLS、检查缓存、创建构建目录并生成源文件和TCL脚本
+    :return: (job, result)，result不为None时无需综合，直接返回该结果
+    """
+    # 如果未指定Vivado HLS路径，尝试自动查找
+    if vivado_hls_path is None:
+        vivado_hls_path = find_vivado_hls()
+        if vivado_hls_path:
+            print(f"找到Vivado HLS: {vivado_hls_path}")
+        else:
+            return None, _vivado_not_found()
+    
+    # 相同输入和相同工具直接返回缓存的综合结果；各字段用\0分隔，避免拼接后混淆
+    tool_path = os.path.realpath(shutil.which(vivado_hls_path) or vivado_hls_path)
+    key_parts = [code_str, top_function, target_device, str(clock_period), tool_path]
+    for name, content in sorted((header_files or {}).items()):
+        key_parts += [name, content]
+    cache_key = hashlib.sha256("\0".join(key_parts).encode("utf-8")).hexdigest()
+    cache_file = CACHE_DIR / f"{cache_key}.json"
+    if not force_rebuild and cache_file.exists():
+        try:
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+            print(f"使用缓存的综合结果: {cache_file}")
+            return None, cached
+        except (OSError, ValueError):
+            pass
+    
+    # 未指定构建目录时使用全新的临时目录，无需先删除旧的构建产物
+    explicit_build = build_dir is not None
+    temp_build = build_dir is None and not reuse_project
+    if temp_build:
+        build_dir = tempfile.mkdtemp(prefix="hls_eval_", dir=os.getcwd())
+    
+    # 创建build目录（只清理本任务自己的目录，不影响并行任务的兄弟目录）
+    build_dir = Path(build_dir).absolute() if build_dir is not None else Path(os.getcwd()) / "build"
+    stamp_file = build_dir / f"{top_function}_prj" / ".stamp.json"
+    stamp = {
+        "src_hash": hashlib.sha256(code_str.encode("utf-8")).hexdigest(),
+        "top": top_function,
+        "device": target_device,
+        "period": clock_period
+    }
+    
+    # 增量模式：顶层函数和器件未变时复用已有工程
+    reuse = False
+    if reuse_project and stamp_file.exists():
+        try:
+            old_stamp = json.loads(stamp_file.read_text(encoding="utf-8"))
+            reuse = old_stamp.get("top") == top_function and old_stamp.get("device") == target_device
+        except (OSError, ValueError):
+            reuse = False
+    
+    if build_dir.exists() and not reuse and not temp_build:
+        # 调用方指定的目录若含有其他文件，拒绝删除，避免误删用户数据
+        if explicit_build and any(build_dir.iterdir()) and not _is_build_dir(build_dir):
+            return None, {
+                "error": f"构建目录 {build_dir} 非空且不是HLS构建目录，拒绝清空。请指定空目录或新目录。",
+                "raw_log": f"Refusing to remove non-build directory: {build_dir}"
+            }
+        shutil.rmtree(build_dir)
+    build_dir.mkdir(parents=True, exist_ok=True)
+    if reuse:
+        # 删除上一次的报告，避免综合失败时误读旧结果
+        old_report = build_dir / f"{top_function}_prj" / "solution1" / "syn" / "report" / f"{top_function}_csynth.rpt"
+        if old_report.exists():
+            old_report.unlink()
+    
+    tcl_file = prepare_project(code_str, top_function, build_dir, target_device, clock_period,
+                               reset=not reuse, header_files=header_files)
+
+    job = {
+        "top_function": top_function,
+        "vivado_hls_path": vivado_hls_path,
+        "build_dir": build_dir,
+        "tcl_file": tcl_file,
+        "log_file": build_dir / "vivado_hls.log",
+        "stamp_file": stamp_file,
+        "stamp": stamp,
+        "temp_build": temp_build,
+        "cache_file": cache_file
+    }
+    return job, None
+
+def _discard_build(job: dict, keep_build: bool) -> bool:
+    """
+    在后台删除自动创建的临时构建目录，不阻塞调用方
+    :param job: _prepare_job返回的任务信息
+    :param keep_build: 为True时保留临时构建目录
+    :return: 是否删除了构建目录
+    """
+    if not job["temp_build"] or keep_build:
+        return False
+    threading.Thread(target=shutil.rmtree, args=(job["build_dir"], True)).start()
+    return True
+
+def _finish_job(job: dict, returncode: int, keep_build: bool) -> dict:
+    """
+    综合结束后的处理：检查返回码、解析报告、清理临时目录并写入缓存
+    :param job: _prepare_job返回的任务信息
+    :param returncode: Vivado HLS进程的返回码
+    :param keep_build: 为True时保留自动创建的临时构建目录
+    :return: 包含性能和资源消耗的字典
+    """
+    build_dir = job["build_dir"]
+    log_file = job["log_file"]
+    raw_log = _read_log_tail(log_file)
+    
+    # 4. 检查执行结果
+    if returncode != 0:
+        result = {
+            "error": f"HLS synthesis failed: {raw_log[-500:]}",
+            "raw_log": raw_log,
+            "log_file": log_file
+        }
+        # 失败的临时工程同样删除，日志尾部已保存在raw_log中
+        if _discard_build(job, keep_build):
+            del result["log_file"]
+        return result
+
+    # 记录工程参数，供下次增量综合判断
+    if job["stamp_file"].parent.exists():
+        job["stamp_file"].write_text(json.dumps(job["stamp"]), encoding="utf-8")
+
+    # 5. 解析报告文件
+    report_results = parse_report(build_dir, job["top_function"])
+    
+    # 6. 返回结果，utilization固定包含resources/available/utilization_percentage三项
+    utilization = report_results.get("utilization", {})
+    result = {
+        "status": "success",
+        "timing": report_results.get("timing", {}),
+        "latency": report_results.get("latency", {}),
+        "utilization": {key: utilization.get(key, {}) for key in _UTIL_ROWS.values()},
+        "raw_log": raw_log,
+        "log_file": log_file
+    }
+    
+    # 无论报告解析是否成功都删除临时构建目录
+    if _discard_build(job, keep_build):
+        del result["log_file"]
+    
+    if "error" not in report_results:
+        # 只缓存报告解析成功的结果
+        try:
+            job["cache_file"].parent.mkdir(parents=True, exist_ok=True)
+            job["cache_file"].write_text(json.dumps(result, default=str), encoding="utf-8")
+        except OSError as e:
+            print(f"写入缓存失败: {str(e)}")
+    
+    return result
+
+def hls_evaluation(code_str: str, top_function: str = "top", target_device: str = "xczu7ev-ffvc1156-2-e", 
+                  clock_period: float = 5.0, vivado_hls_path: str = None, build_dir: str = None,
+                  force_rebuild: bool = False, reuse_project: bool = False, keep_build: bool = False,
+                  header_files: dict = None) -> dict:
+    """
+    HLS代码性能评估函数
+    :param code_str: 输入的C/C++代码字符串
+    :param top_function: 顶层函数名称
+    :param target_device: 目标FPGA型号
+    :param clock_period: 时钟周期(ns)
+    :param vivado_hls_path: Vivado HLS可执行文件的路径，如果为None则尝试自动查找
+    :param build_dir: 构建目录，如果为None则在当前目录下新建临时目录（reuse_project为True时使用build）。
+                      指定的目录在构建前会被清空，因此只接受空目录、不存在的目录或之前的HLS构建目录
+    :param force_rebuild: 为True时忽略缓存，强制重新综合
+    :param reuse_project: 为True时，若已有相同顶层函数和器件的工程，则不使用-reset重建工程
+    :param keep_build: 为True时保留自动创建的临时构建目录
+    :param header_files: 头文件字典，格式为 {"文件名": "文件内容"}，与源文件一起写入构建目录
+    :return: 包含性能和资源消耗的字典
+    """
+    job, result = _prepare_job(code_str, top_function, target_device, clock_period,
+                               vivado_hls_path, build_dir, force_rebuild, reuse_project, header_files)
+    if result is not None:
+        return result
+
+    # 3. 执行Vivado HLS
+    try:
+        returncode = run_synth(job["tcl_file"], job["vivado_hls_path"], job["build_dir"])
+        return _finish_job(job, returncode, keep_build)
+    except Exception as e:
+        _discard_build(job, keep_build)
         return {
-            "status": "success",
-            "timing": report_results.get("timing", {}),
-            "latency": report_results.get("latency", {}),
-            "utilization": report_results.get("utilization", {}),
-            "raw_log": proc.stdout,
-            "log_file": build_dir / "vivado_hls.log"
+            "error": f"执行过程中发生错误: {str(e)}",
+            "raw_log": f"Exception occurred during execution: {str(e)}",
+            "log_file": None
         }
+
+async def hls_evaluation_async(code_str: str, top_function: str = "top", target_device: str = "xczu7ev-ffvc1156-2-e",
+                               clock_period: float = 5.0, vivado_hls_path: str = None, build_dir: str = None,
+                               force_rebuild: bool = False, reuse_project: bool = False,
+                               keep_build: bool = False, header_files: dict = None) -> dict:
+    """
+    hls_evaluation的异步版本，Vivado HLS进程运行期间不占用Python线程
+    参数和返回值与hls_evaluation相同
+    """
+    # asyncio导入开销较大，只在使用异步接口时导入
+    import asyncio
+    
+    # 准备阶段可能需要删除旧的构建目录，放到线程中执行以免阻塞事件循环
+    job, result = await asyncio.to_thread(_prepare_job, code_str, top_function, target_device, clock_period,
+                                          vivado_hls_path, build_dir, force_rebuild, reuse_project, header_files)
+    if result is not None:
+        return result
+
+    try:
+        cmd = _synth_command(job["vivado_hls_path"], job["tcl_file"])
+        print(f"执行命令: {' '.join(cmd)}")
+        with open(job["log_file"], "wb") as logf:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                cwd=str(job["build_dir"]),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=logf,
+                stderr=asyncio.subprocess.STDOUT,
+                # vivado_hls是启动实际程序的包装脚本，放到单独的进程组中以便取消时一并结束
+                start_new_session=os.name != "nt"
+            )
+            try:
+                returncode = await proc.wait()
+            except asyncio.CancelledError:
+                # 任务被取消时结束Vivado HLS进程，避免其在无人等待的情况下继续运行
+                if proc.returncode is None:
+                    if os.name != "nt":
+                        os.killpg(proc.pid, signal.SIGKILL)
+                    else:
+                        proc.kill()
+                await proc.wait()
+                _discard_build(job, keep_build)
+                raise
+        # 报告解析可能需要短暂等待文件出现，放到线程中执行以免阻塞事件循环
+        return await asyncio.to_thread(_finish_job, job, returncode, keep_build)
     except Exception as e:
+        _discard_build(job, keep_build)
         return {
             "error": f"执行过程中发生错误: {str(e)}",
             "raw_log": f"Exception occurred during execution: {str(e)}",
             "log_file": None
         }
     
+def _pin_worker(counter, cpus):
+    """
+    进程池初始化函数：将每个worker绑定到独立的CPU核心（仅在支持的平台上生效）
+    :param counter: 进程间共享的worker计数器
+    :param cpus: 父进程允许使用的CPU列表，为None时不绑定
+    """
+    if not cpus:
+        return
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+
+def _run_one(args):
+    """
+    进程池worker：执行单个HLS评估任务
+    """
+    code_str, top_function, target_device, clock_period, vivado_hls_path, build_dir, force_rebuild = args
+    return hls_evaluation(code_str, top_function, target_device, clock_period, vivado_hls_path, build_dir,
+                          force_rebuild)
+
+def hls_evaluation_batch(code_list: list, top_function: str = "top", target_device: str = "xczu7ev-ffvc1156-2-e",
+                         clock_period: float = 5.0, vivado_hls_path: str = None, max_workers: int = None,
+                         pin_cpu: bool = False, force_rebuild: bool = False) -> list:
+    """
+    并行评估多个HLS设计，每个任务使用独立的build/job_i目录
+    :param code_list: C/C++代码字符串列表
+    :param top_function: 顶层函数名称
+    :param target_device: 目标FPGA型号
+    :param clock_period: 时钟周期(ns)
+    :param vivado_hls_path: Vivado HLS可执行文件的路径，如果为None则尝试自动查找
+    :param max_workers: 最大并行进程数，默认为当前进程可用的CPU核心数
+    :param pin_cpu: 是否将每个worker绑定到独立的CPU核心
+    :param force_rebuild: 为True时忽略缓存，强制重新综合
+    :return: 与code_list顺序一致的结果字典列表
+    """
+    # 进程池相关模块只在批量评估时导入，避免每个worker进程加载
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    # 在父进程中查找一次Vivado HLS路径，避免每个worker重复查找
+    if vivado_hls_path is None:
+        vivado_hls_path = find_vivado_hls()
+        if vivado_hls_path:
+            print(f"找到Vivado HLS: {vivado_hls_path}")
+        else:
+            return [_vivado_not_found() for _ in code_list]
+    
+    batch_dir = Path(os.getcwd()) / "build"
+    args = [
+        (code_str, top_function, target_device, clock_period, vivado_hls_path, str(batch_dir / f"job_{i}"),
+         force_rebuild)
+        for i, code_str in enumerate(code_list)
+    ]
+    
+    # taskset、容器cpuset等限制下可用的CPU不一定是全部核心，只在允许的CPU中选择
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+    
+    initializer = None
+    initargs = ()
+    if pin_cpu:
+        initializer = _pin_worker
+        initargs = (multiprocessing.Value("i", 0), cpus)
+    
+    with ProcessPoolExecutor(max_workers=max_workers or (len(cpus) if cpus else os.cpu_count()),
+                             initializer=initializer, initargs=initargs) as ex:
+        return list(ex.map(_run_one, args))
+
+async def hls_evaluation_batch_async(code_list: list, top_function: str = "top",
+                                     target_device: str = "xczu7ev-ffvc1156-2-e", clock_period: float = 5.0,
+                                     vivado_hls_path: str = None, max_in_flight: int = None,
+                                     force_rebuild: bool = False) -> list:
+    """
+    在单个Python进程中并发评估多个HLS设计，每个任务使用独立的build/job_i目录
+    :param code_list: C/C++代码字符串列表
+    :param top_function: 顶层函数名称
+    :param target_device: 目标FPGA型号
+    :param clock_period: 时钟周期(ns)
+    :param vivado_hls_path: Vivado HLS可执行文件的路径，如果为None则尝试自动查找
+    :param max_in_flight: 同时运行的Vivado HLS进程数上限（受License/内存限制），默认为CPU核心数
+    :param force_rebuild: 为True时忽略缓存，强制重新综合
+    :return: 与code_list顺序一致的结果字典列表
+    """
+    import asyncio
+    
+    if vivado_hls_path is None:
+        vivado_hls_path = find_vivado_hls()
+        if vivado_hls_path:
+            print(f"找到Vivado HLS: {vivado_hls_path}")
+        else:
+            return [_vivado_not_found() for _ in code_list]
+    
+    batch_dir = Path(os.getcwd()) / "build"
+    semaphore = asyncio.Semaphore(max_in_flight or os.cpu_count() or 1)
+    
+    async def run(i, code_str):
+        async with semaphore:
+            return await hls_evaluation_async(code_str, top_function, target_device, clock_period,
+                                              vivado_hls_path, str(batch_dir / f"job_{i}"), force_rebuild)
+    
+    return await asyncio.gather(*(run(i, code_str) for i, code_str in enumerate(code_list)))
+
 def print_result(result: dict):
     """
     打印HLS评估结果
@@ -379,7 +702,8 @@ def print_result(result: dict):
     
     if "error" in result:
         print(f"Error: {result['error']}")
-        print(f"\n完整日志保存在: {result.get('log_file', 'build目录')}")
+        if result.get("log_file"):
+            print(f"\n完整日志保存在: {result['log_file']}")
         return
     
     # 打印时序信息
@@ -400,34 +724,19 @@ def print_result(result: dict):
     
     # 打印资源利用率
     print("\nResource Utilization:")
-    if "utilization" in result and result["utilization"]:
-        # 打印资源使用情况
-        if "resources" in result["utilization"] and result["utilization"]["resources"]:
-            print("  Resources:")
-            for key, value in result["utilization"]["resources"].items():
-                print(f"    {key}: {value}")
-        elif isinstance(result["utilization"], dict) and not all(k in ["available", "utilization_percentage"] for k in result["utilization"].keys()):
-            # 兼容旧格式
-            print("  Resources:")
-            for key, value in result["utilization"].items():
-                if key not in ["available", "utilization_percentage"]:
+    utilization = result.get("utilization", {})
+    if any(utilization.get(section) for section, _ in _UTIL_TITLES):
+        # 依次打印资源使用情况、可用资源和使用百分比
+        for section, title in _UTIL_TITLES:
+            if utilization.get(section):
+                print(f"  {title}:")
+                for key, value in utilization[section].items():
                     print(f"    {key}: {value}")
-        
-        # 打印可用资源
-        if "available" in result["utilization"] and result["utilization"]["available"]:
-            print("  Available Resources:")
-            for key, value in result["utilization"]["available"].items():
-                print(f"    {key}: {value}")
-        
-        # 打印使用百分比
-        if "utilization_percentage" in result["utilization"] and result["utilization"]["utilization_percentage"]:
-            print("  Utilization Percentage:")
-            for key, value in result["utilization"]["utilization_percentage"].items():
-                print(f"    {key}: {value}")
     else:
         print("  No resource utilization information available")
     
-    print(f"\n完整日志保存在: {result.get('log_file', 'build目录')}")
+    if result.get("log_file"):
+        print(f"\n完整日志保存在: {result['log_file']}")
 
 
 # 使用示例
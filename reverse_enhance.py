@@ -1,12 +1,25 @@
 import re
+import mmap
 import random
 import os
 import argparse
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Final
 
 # 污染策略类型
 POLLUTION_TYPES = ["system_call", "dynamic_memory", "stl", "exception"]
 
+# 预编译的正则表达式
+_FUNC_RE = re.compile(r'void\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\s*{')
+# 在字节上匹配，\s和\d只匹配ASCII字符；示例编号和Markdown标题本身都是ASCII，不受影响
+_EXAMPLE_RE = re.compile(rb'# (\d+)\s+# ([^\n]+)\s+(.*?)(?=# \d+|\Z)', re.DOTALL)
+_LAST_NUM_RE = re.compile(r'# (\d+)\s+')
+
+def _decode_group(raw: bytes) -> str:
+    """
+    解码正则捕获的字节片段，并像文本模式读取一样把\r\n和\r统一为\n
+    """
+    return raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n').strip()
+
 def parse_src_md(file_path: str) -> List[Dict]:
     """
     解析src.md文件，提取可综合代码
@@ -17,23 +30,22 @@ def parse_src_md(file_path: str) -> List[Dict]:
     examples = []
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # 空文件无法内存映射
+        if os.path.getsize(file_path) == 0:
+            return examples
         
-        # 使用正则表达式分割示例
-        example_pattern = r'# (\d+)\s+# ([^\n]+)\s+(.*?)(?=# \d+|\Z)'
-        matches = re.findall(example_pattern, content, re.DOTALL)
-        
-        for match in matches:
-            example_num = match[0].strip()
-            top_function = match[1].strip()
-            source_code = match[2].strip()
-            
-            examples.append({
-                'number': example_num,
-                'top_function': top_function,
-                'source_code': source_code
-            })
+        # 内存映射文件并直接在字节上匹配，只解码捕获到的片段
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for match in _EXAMPLE_RE.finditer(mm):
+                example_num = _decode_group(match.group(1))
+                top_function = _decode_group(match.group(2))
+                source_code = _decode_group(match.group(3))
+                
+                examples.append({
+                    'number': example_num,
+                    'top_function': top_function,
+                    'source_code': source_code
+                })
         
         return examples
     
@@ -41,63 +53,16 @@ def parse_src_md(file_path: str) -> List[Dict]:
         print(f"解析src.md文件时出错: {e}")
         return []
 
-def apply_system_call_pollution(code: str) -> Tuple[str, Dict]:
-    """
-    应用系统调用污染
-    
-    :param code: 原始代码
-    :return: 污染后的代码和污染信息
-    """
-    # 查找主函数或顶层函数的开始位置
-    function_pattern = r'void\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\s*{'
-    match = re.search(function_pattern, code)
-    
-    if not match:
-        return code, {"success": False, "message": "找不到合适的函数进行污染"}
-    
-    function_start = match.start()
-    function_name = match.group(1)
-    
-    # 在函数开始处插入系统调用
-    system_call = """
+# 系统调用污染代码片段
+_SYSCALL_SNIPPET: Final[str] = """
     // 添加系统调用（不可综合）
     FILE *log_file = fopen("log.txt", "w");
     fprintf(log_file, "Function %s called\\n", __func__);
     fclose(log_file);
     """
-    
-    # 找到函数体的开始位置（第一个{之后）
-    body_start = code.find('{', function_start) + 1
-    
-    # 插入系统调用
-    polluted_code = code[:body_start] + system_call + code[body_start:]
-    
-    return polluted_code, {
-        "success": True, 
-        "pollution_type": "system_call",
-        "function_name": function_name,
-        "position": body_start
-    }
 
-def apply_dynamic_memory_pollution(code: str) -> Tuple[str, Dict]:
-    """
-    应用动态内存污染
-    
-    :param code: 原始代码
-    :return: 污染后的代码和污染信息
-    """
-    # 查找主函数或顶层函数的开始位置
-    function_pattern = r'void\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\s*{'
-    match = re.search(function_pattern, code)
-    
-    if not match:
-        return code, {"success": False, "message": "找不到合适的函数进行污染"}
-    
-    function_start = match.start()
-    function_name = match.group(1)
-    
-    # 在函数开始处插入动态内存分配
-    dynamic_memory = """
+# 动态内存污染代码片段
+_DYN_MEM_SNIPPET: Final[str] = """
     // 添加动态内存分配（不可综合）
     int dynamic_size = 100;
     float* dynamic_array = (float*)malloc(dynamic_size * sizeof(float));
@@ -116,43 +81,9 @@ def apply_dynamic_memory_pollution(code: str) -> Tuple[str, Dict]:
     // 释放内存
     free(dynamic_array);
     """
-    
-    # 找到函数体的开始位置（第一个{之后）
-    body_start = code.find('{', function_start) + 1
-    
-    # 插入动态内存分配
-    polluted_code = code[:body_start] + dynamic_memory + code[body_start:]
-    
-    # 添加头文件
-    if "#include <stdlib.h>" not in code:
-        polluted_code = "#include <stdlib.h>\n" + polluted_code
-    
-    return polluted_code, {
-        "success": True, 
-        "pollution_type": "dynamic_memory",
-        "function_name": function_name,
-        "position": body_start
-    }
 
-def apply_stl_pollution(code: str) -> Tuple[str, Dict]:
-    """
-    应用STL污染
-    
-    :param code: 原始代码
-    :return: 污染后的代码和污染信息
-    """
-    # 查找主函数或顶层函数的开始位置
-    function_pattern = r'void\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\s*{'
-    match = re.search(function_pattern, code)
-    
-    if not match:
-        return code, {"success": False, "message": "找不到合适的函数进行污染"}
-    
-    function_start = match.start()
-    function_name = match.group(1)
-    
-    # 在函数开始处插入STL使用
-    stl_code = """
+# STL污染代码片段
+_STL_SNIPPET: Final[str] = """
     // 添加STL使用（不可综合）
     std::vector<float> vec;
     for(int i = 0; i < 100; i++) {
@@ -168,45 +99,9 @@ def apply_stl_pollution(code: str) -> Tuple[str, Dict]:
         sum += val;
     }
     """
-    
-    # 找到函数体的开始位置（第一个{之后）
-    body_start = code.find('{', function_start) + 1
-    
-    # 插入STL使用
-    polluted_code = code[:body_start] + stl_code + code[body_start:]
-    
-    # 添加头文件
-    if "#include <vector>" not in code:
-        polluted_code = "#include <vector>\n" + polluted_code
-    if "#include <algorithm>" not in code:
-        polluted_code = "#include <algorithm>\n" + polluted_code
-    
-    return polluted_code, {
-        "success": True, 
-        "pollution_type": "stl",
-        "function_name": function_name,
-        "position": body_start
-    }
 
-def apply_exception_pollution(code: str) -> Tuple[str, Dict]:
-    """
-    应用异常处理污染
-    
-    :param code: 原始代码
-    :return: 污染后的代码和污染信息
-    """
-    # 查找主函数或顶层函数的开始位置
-    function_pattern = r'void\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\([^)]*\)\s*{'
-    match = re.search(function_pattern, code)
-    
-    if not match:
-        return code, {"success": False, "message": "找不到合适的函数进行污染"}
-    
-    function_start = match.start()
-    function_name = match.group(1)
-    
-    # 在函数开始处插入异常处理
-    exception_code = """
+# 异常处理污染代码片段
+_EXC_SNIPPET: Final[str] = """
     // 添加异常处理（不可综合）
     try {
         float a = 10.0f;
@@ -221,53 +116,20 @@ def apply_exception_pollution(code: str) -> Tuple[str, Dict]:
         // 处理异常
     }
     """
-    
-    # 找到函数体的开始位置（第一个{之后）
-    body_start = code.find('{', function_start) + 1
-    
-    # 插入异常处理
-    polluted_code = code[:body_start] + exception_code + code[body_start:]
-    
-    # 添加头文件
-    if "#include <stdexcept>" not in code:
-        polluted_code = "#include <stdexcept>\n" + polluted_code
-    
-    return polluted_code, {
-        "success": True, 
-        "pollution_type": "exception",
-        "function_name": function_name,
-        "position": body_start
-    }
 
-def generate_fix(polluted_code: str, pollution_info: Dict) -> str:
-    """
-    根据污染信息生成修复代码
-    
-    :param polluted_code: 污染后的代码
-    :param pollution_info: 污染信息
-    :return: 修复后的代码
+# 系统调用修复代码片段：使用__SYNTHESIS__宏排除系统调用
+_SYSCALL_FIXED: Final[str] = """
+    #ifndef __SYNTHESIS__
+    // 添加系统调用（不可综合）
+    FILE *log_file = fopen("log.txt", "w");
+    fprintf(log_file, "Function %s called\\n", __func__);
+    fclose(log_file);
+#endif
     """
-    if not pollution_info["success"]:
-        return polluted_code
-    
-    pollution_type = pollution_info["pollution_type"]
-    
-    if pollution_type == "system_call":
-        # 使用__SYNTHESIS__宏排除系统调用
-        fixed_code = polluted_code.replace(
-            "// 添加系统调用（不可综合）",
-            "#ifndef __SYNTHESIS__\n    // 添加系统调用（不可综合）"
-        )
-        fixed_code = fixed_code.replace(
-            "fclose(log_file);",
-            "fclose(log_file);\n#endif"
-        )
-        
-    elif pollution_type == "dynamic_memory":
-        # 使用固定大小的资源替代动态内存
-        fixed_code = polluted_code.replace(
-            "// 添加动态内存分配（不可综合）\n    int dynamic_size = 100;\n    float* dynamic_array = (float*)malloc(dynamic_size * sizeof(float));",
-            """// 使用固定大小的资源替代动态内存
+
+# 动态内存修复代码片段：使用固定大小的资源替代动态内存
+_DYN_MEM_FIXED: Final[str] = """
+    // 使用固定大小的资源替代动态内存
 #ifdef NO_SYNTH
     int dynamic_size = 100;
     float* dynamic_array = (float*)malloc(dynamic_size * sizeof(float));
@@ -275,35 +137,28 @@ def generate_fix(polluted_code: str, pollution_info: Dict) -> str:
     int dynamic_size = 100;
     float _dynamic_array[100];
     float* dynamic_array = _dynamic_array;
-#endif"""
-        )
-        
-        fixed_code = fixed_code.replace(
-            "// 释放内存\n    free(dynamic_array);",
-            """// 释放内存
-#ifdef NO_SYNTH
-    free(dynamic_array);
-#endif"""
-        )
-        
-    elif pollution_type == "stl":
-        # 使用固定大小的数组替代STL
-        fixed_code = polluted_code.replace(
-            """// 添加STL使用（不可综合）
-    std::vector<float> vec;
-    for(int i = 0; i < 100; i++) {
-        vec.push_back((float)i);
+#endif
+    
+    // 初始化动态数组
+    for(int i = 0; i < dynamic_size; i++) {
+        dynamic_array[i] = (float)i;
     }
     
-    // 使用STL算法
-    std::sort(vec.begin(), vec.end());
+    // 使用动态数组
+    float dynamic_sum = 0;
+    for(int i = 0; i < dynamic_size; i++) {
+        dynamic_sum += dynamic_array[i];
+    }
     
-    // 计算总和
-    float sum = 0;
-    for(auto val : vec) {
-        sum += val;
-    }""",
-            """// 使用固定大小的数组替代STL
+    // 释放内存
+#ifdef NO_SYNTH
+    free(dynamic_array);
+#endif
+    """
+
+# STL修复代码片段：使用固定大小的数组替代STL
+_STL_FIXED: Final[str] = """
+    // 使用固定大小的数组替代STL
     float vec[100];
     int vec_size = 0;
     
@@ -327,26 +182,12 @@ def generate_fix(polluted_code: str, pollution_info: Dict) -> str:
     float sum = 0;
     for(int i = 0; i < vec_size; i++) {
         sum += vec[i];
-    }"""
-        )
-        
-    elif pollution_type == "exception":
-        # 使用条件检查替代异常处理
-        fixed_code = polluted_code.replace(
-            """// 添加异常处理（不可综合）
-    try {
-        float a = 10.0f;
-        float b = 0.0f;
-        
-        if(b == 0.0f) {
-            throw std::runtime_error("Division by zero");
-        }
-        
-        float result = a / b;
-    } catch(const std::exception& e) {
-        // 处理异常
-    }""",
-            """// 使用条件检查替代异常处理
+    }
+    """
+
+# 异常处理修复代码片段：使用条件检查替代异常处理
+_EXC_FIXED: Final[str] = """
+    // 使用条件检查替代异常处理
     float a = 10.0f;
     float b = 0.0f;
     
@@ -354,13 +195,82 @@ def generate_fix(polluted_code: str, pollution_info: Dict) -> str:
         // 处理错误情况
     } else {
         float result = a / b;
-    }"""
-        )
+    }
+    """
+
+# 污染类型 -> 修复后的代码片段
+_FIXED_SNIPPETS: Dict[str, str] = {
+    "system_call": _SYSCALL_FIXED,
+    "dynamic_memory": _DYN_MEM_FIXED,
+    "stl": _STL_FIXED,
+    "exception": _EXC_FIXED,
+}
+
+# 污染类型 -> (插入到函数体开头的代码片段, 需要的头文件)
+POLLUTION_TABLE: Dict[str, Tuple[str, List[str]]] = {
+    "system_call": (_SYSCALL_SNIPPET, []),
+    "dynamic_memory": (_DYN_MEM_SNIPPET, ["#include <stdlib.h>"]),
+    "stl": (_STL_SNIPPET, ["#include <vector>", "#include <algorithm>"]),
+    "exception": (_EXC_SNIPPET, ["#include <stdexcept>"]),
+}
+
+def _apply_pollution(code: str, pollution_type: str) -> Tuple[str, Dict]:
+    """
+    在第一个void函数的函数体开头插入指定类型的污染代码
+    
+    :param code: 原始代码
+    :param pollution_type: 污染类型，必须是POLLUTION_TABLE中的键
+    :return: 污染后的代码和污染信息
+    """
+    snippet, includes = POLLUTION_TABLE[pollution_type]
+    
+    # 查找主函数或顶层函数的开始位置
+    match = _FUNC_RE.search(code)
+    
+    if not match:
+        return code, {"success": False, "message": "找不到合适的函数进行污染"}
+    
+    function_name = match.group(1)
+    
+    # 函数体的开始位置：正则以{结尾，匹配结束处即为{之后
+    body_start = match.end()
+    
+    # 添加头文件：#include只会出现在函数体之前，只检查这一段
+    header_zone = code[:body_start]
+    missing_headers = "".join(header + "\n" for header in reversed(includes) if header not in header_zone)
+    
+    # 插入污染代码，并记录污染代码在结果中的位置供generate_fix使用
+    snippet_start = len(missing_headers) + body_start
+    polluted_code = "".join([missing_headers, code[:body_start], snippet, code[body_start:]])
+    
+    return polluted_code, {
+        "success": True, 
+        "pollution_type": pollution_type,
+        "function_name": function_name,
+        "position": body_start,
+        "snippet_start": snippet_start,
+        "snippet_end": snippet_start + len(snippet)
+    }
+
+def generate_fix(polluted_code: str, pollution_info: Dict) -> str:
+    """
+    根据污染信息生成修复代码
     
-    else:
-        fixed_code = polluted_code
+    :param polluted_code: 污染后的代码
+    :param pollution_info: 污染信息
+    :return: 修复后的代码
+    """
+    if not pollution_info["success"]:
+        return polluted_code
+    
+    fixed_snippet = _FIXED_SNIPPETS.get(pollution_info["pollution_type"])
+    if fixed_snippet is None:
+        return polluted_code
     
-    return fixed_code
+    # 按污染时记录的位置直接替换整段污染代码
+    start = pollution_info["snippet_start"]
+    end = pollution_info["snippet_end"]
+    return "".join([polluted_code[:start], fixed_snippet, polluted_code[end:]])
 
 def apply_pollution(code: str, pollution_type: str) -> Tuple[str, Dict]:
     """
@@ -370,16 +280,25 @@ def apply_pollution(code: str, pollution_type: str) -> Tuple[str, Dict]:
     :param pollution_type: 污染类型
     :return: 污染后的代码和污染信息
     """
-    if pollution_type == "system_call":
-        return apply_system_call_pollution(code)
-    elif pollution_type == "dynamic_memory":
-        return apply_dynamic_memory_pollution(code)
-    elif pollution_type == "stl":
-        return apply_stl_pollution(code)
-    elif pollution_type == "exception":
-        return apply_exception_pollution(code)
-    else:
+    if pollution_type not in POLLUTION_TABLE:
         return code, {"success": False, "message": f"未知的污染类型: {pollution_type}"}
+    return _apply_pollution(code, pollution_type)
+
+# 污染类型 -> (子类, 转写规则)
+_META: Dict[str, Tuple[str, str]] = {
+    "system_call": ("系统调用", "使用 `__SYNTHESIS__`宏，从设计中排除不可综合的代码。"),
+    "dynamic_memory": ("动态存储器使用", "创建固定大小的资源，并将现有指针直接设置为指向此固定大小的资源。"),
+    "stl": ("标准模板库", "创建局部函数，该函数具有相同功能但不呈现递归、动态存储器分配或动态创建和解构对象特征。"),
+    "exception": ("异常处理", "用返回值或状态寄存器替代 `try/catch`，避免硬件无法实现的异常机制。"),
+}
+
+# c2c.md条目中固定不变的各段标题（大类对所有污染类型相同）
+_HDR_NUMBER: Final[str] = "# "
+_HDR_SUBCATEGORY: Final[str] = "\n\n## 大类\n\n不受支持的C/C++构造\n\n## 子类\n\n"
+_HDR_RULE: Final[str] = "\n\n## 转写规则\n\n"
+_HDR_TOP: Final[str] = "\n\n## Top Function\n\n"
+_HDR_SOURCE: Final[str] = "\n\n## 源代码\n\n"
+_HDR_FIXED: Final[str] = "\n\n## 转写后代码\n\n"
 
 def generate_c2c_md_entry(number: int, top_function: str, source_code: str, fixed_code: str, pollution_type: str) -> str:
     """
@@ -392,54 +311,37 @@ def generate_c2c_md_entry(number: int, top_function: str, source_code: str, fixe
     :param pollution_type: 污染类型
     :return: c2c.md格式的条目
     """
-    # 根据污染类型确定大类和子类
-    category = "不受支持的C/C++构造"
-    
-    if pollution_type == "system_call":
-        subcategory = "系统调用"
-        transform_rule = "使用 `__SYNTHESIS__`宏，从设计中排除不可综合的代码。"
-    elif pollution_type == "dynamic_memory":
-        subcategory = "动态存储器使用"
-        transform_rule = "创建固定大小的资源，并将现有指针直接设置为指向此固定大小的资源。"
-    elif pollution_type == "stl":
-        subcategory = "标准模板库"
-        transform_rule = "创建局部函数，该函数具有相同功能但不呈现递归、动态存储器分配或动态创建和解构对象特征。"
-    elif pollution_type == "exception":
-        subcategory = "异常处理"
-        transform_rule = "用返回值或状态寄存器替代 `try/catch`，避免硬件无法实现的异常机制。"
-    else:
-        subcategory = "未知"
-        transform_rule = "未知"
-    
-    # 生成c2c.md格式的条目
-    entry = f"""# {number}
-
-## 大类
-
-{category}
-
-## 子类
-
-{subcategory}
-
-## 转写规则
-
-{transform_rule}
-
-## Top Function
-
-{top_function}
-
-## 源代码
-
-{source_code}
-
-## 转写后代码
+    # 根据污染类型确定子类和转写规则
+    subcategory, transform_rule = _META.get(pollution_type, ("未知", "未知"))
+    
+    return "".join([
+        _HDR_NUMBER, str(number),
+        _HDR_SUBCATEGORY, subcategory,
+        _HDR_RULE, transform_rule,
+        _HDR_TOP, top_function,
+        _HDR_SOURCE, source_code,
+        _HDR_FIXED, fixed_code, "\n"
+    ])
 
-{fixed_code}
-"""
+def read_last_example_number(file_path: str) -> Optional[int]:
+    """
+    从文件末尾向前读取，查找最后一个示例的编号
     
-    return entry
+    :param file_path: c2c.md文件路径
+    :return: 最后一个示例的编号，找不到时返回None
+    """
+    with open(file_path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        # 先读末尾4KB，找不到再逐步扩大读取范围
+        for window in (4096, 65536, size):
+            f.seek(max(0, size - window))
+            tail = f.read().decode('utf-8', errors='ignore')
+            matches = _LAST_NUM_RE.findall(tail)
+            if matches:
+                return int(matches[-1])
+            if window >= size:
+                break
+    return None
 
 def augment_dataset(src_md_path: str, output_path: str, num_samples: int = 10):
     """
@@ -458,63 +360,72 @@ def augment_dataset(src_md_path: str, output_path: str, num_samples: int = 10):
     
     print(f"找到 {len(examples)} 个示例")
     
-    # 读取现有的c2c.md文件，确定起始编号
-    try:
-        with open(output_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 查找最后一个示例的编号
-        last_example_pattern = r'# (\d+)\s+'
-        matches = re.findall(last_example_pattern, content)
-        
-        if matches:
-            start_number = int(matches[-1]) + 1
-        else:
+    # 优先从索引文件读取下一个编号；索引文件记录了写入时c2c.md的大小，
+    # 文件被手动修改或替换后大小不一致，此时读取c2c.md文件末尾
+    idx_path = output_path + ".idx"
+    start_number = None
+    if os.path.exists(output_path):
+        try:
+            with open(idx_path, 'r', encoding='utf-8') as f:
+                next_idx, recorded_size = (int(field) for field in f.read().split())
+            if recorded_size == os.path.getsize(output_path):
+                start_number = next_idx
+        except (OSError, ValueError):
+            start_number = None
+    
+    if start_number is None:
+        try:
+            last_number = read_last_example_number(output_path)
+            start_number = last_number + 1 if last_number is not None else 1
+        except FileNotFoundError:
+            # 文件不存在，从1开始
             start_number = 1
-            
-    except FileNotFoundError:
-        # 文件不存在，从1开始
-        start_number = 1
-        content = ""
-    
-    # 生成新样本
-    new_entries = []
-    
-    for i in range(num_samples):
-        # 随机选择一个示例
-        example = random.choice(examples)
-        
-        # 随机选择一种污染类型
-        pollution_type = random.choice(POLLUTION_TYPES)
-        
-        # 应用污染
-        polluted_code, pollution_info = apply_pollution(example['source_code'], pollution_type)
-        
-        if not pollution_info["success"]:
-            print(f"示例 {example['number']} 污染失败: {pollution_info['message']}")
-            continue
-        
-        # 生成修复代码
-        fixed_code = generate_fix(polluted_code, pollution_info)
-        
-        # 生成c2c.md条目
-        entry = generate_c2c_md_entry(
-            start_number + i,
-            example['top_function'],
-            polluted_code,
-            fixed_code,
-            pollution_type
-        )
-        
-        new_entries.append(entry)
-        print(f"生成示例 #{start_number + i} ({pollution_type})")
     
-    # 写入文件
-    with open(output_path, 'a', encoding='utf-8') as f:
-        for entry in new_entries:
-            f.write(entry + "\n")
+    # 在(示例, 污染类型)组合上打乱后依次取样，全部组合用完之前不会重复
+    # 使用独立的随机数生成器，不依赖全局random状态
+    rng = random.Random()
+    pairs = [(example, pollution_type) for example in examples for pollution_type in POLLUTION_TYPES]
+    rng.shuffle(pairs)
+    pairs = (pairs * (num_samples // len(pairs) + 1))[:num_samples]
+    
+    # 生成新样本，每生成一条就追加写入文件，不在内存中累积
+    num_generated = 0
+    next_number = start_number
     
-    print(f"成功生成 {len(new_entries)} 个新示例，写入 {output_path}")
+    # 中途中断时也要记录已写入条目之后的编号，避免下次运行重复编号
+    try:
+        with open(output_path, 'a', encoding='utf-8') as f:
+            for i, (example, pollution_type) in enumerate(pairs):
+                # 应用污染
+                polluted_code, pollution_info = apply_pollution(example['source_code'], pollution_type)
+                
+                if not pollution_info["success"]:
+                    print(f"示例 {example['number']} 污染失败: {pollution_info['message']}")
+                    continue
+                
+                # 生成修复代码
+                fixed_code = generate_fix(polluted_code, pollution_info)
+                
+                # 生成c2c.md条目
+                entry = generate_c2c_md_entry(
+                    start_number + i,
+                    example['top_function'],
+                    polluted_code,
+                    fixed_code,
+                    pollution_type
+                )
+                
+                f.write(entry)
+                f.write("\n")
+                num_generated += 1
+                next_number = start_number + i + 1
+                print(f"生成示例 #{start_number + i} ({pollution_type})")
+    finally:
+        if num_generated:
+            with open(idx_path, 'w', encoding='utf-8') as f:
+                f.write(f"{next_number} {os.path.getsize(output_path)}")
+    
+    print(f"成功生成 {num_generated} 个新示例，写入 {output_path}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='HLS代码数据集逆向增强工具')
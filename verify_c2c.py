@@ -1,11 +1,52 @@
 from hls_script import hls_evaluation, print_result
+import io
 import os
-import re
+import sys
+import hashlib
 import argparse  # 添加argparse模块
 import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict
+
+# 本次运行中已验证过（或正在验证）的代码结果，键为代码、顶层函数和头文件的哈希；
+# 值为Future，并行验证时相同代码的后续调用等待第一次综合的结果而不是重复综合
+_HLS_RESULT_CACHE: Dict[str, Future] = {}
+_HLS_RESULT_LOCK = threading.Lock()
+
+class _ThreadBufferedStdout:
+    """
+    按线程缓存输出的stdout代理，并行验证时每个示例的输出攒齐后再整体打印，避免多个示例的输出交错
+    未开启缓存的线程直接写到原stdout
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def start(self):
+        self._local.buffer = io.StringIO()
+    
+    def stop(self) -> str:
+        buffer = self._local.buffer
+        self._local.buffer = None
+        return buffer.getvalue()
+    
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            return self._stream.write(text)
+        return buffer.write(text)
+    
+    def flush(self):
+        self._stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
 
 def verify_hls_code(code_str: str, top_function: str = "top", target_device: str = "xczu7ev-ffvc1156-2-e", 
-                  clock_period: float = 5.0, vivado_hls_path: str = None, header_files: dict = None) -> dict:
+                  clock_period: float = 5.0, vivado_hls_path: str = None, header_files: dict = None,
+                  force_rebuild: bool = False) -> dict:
     """
     验证HLS代码
     
@@ -15,21 +56,12 @@ def verify_hls_code(code_str: str, top_function: str = "top", target_device: str
     :param clock_period: 时钟周期（ns）
     :param vivado_hls_path: Vivado HLS路径
     :param header_files: 头文件字典，格式为 {"文件名": "文件内容"}
+    :param force_rebuild: 为True时忽略综合结果缓存，强制重新综合
     :return: HLS评估结果
     """
-    # 创建build目录
-    build_dir = os.path.join(os.getcwd(), "build")
-    os.makedirs(build_dir, exist_ok=True)
-    
-    # 如果提供了头文件，先写入头文件
-    if header_files:
-        for filename, content in header_files.items():
-            header_path = os.path.join(build_dir, filename)
-            with open(header_path, "w") as f:
-                f.write(content)
-    
-    # 调用hls_evaluation函数进行评估
-    return hls_evaluation(code_str, top_function, target_device, clock_period, vivado_hls_path)
+    # 调用hls_evaluation函数进行评估，头文件与源文件写入同一个构建目录
+    return hls_evaluation(code_str, top_function, target_device, clock_period, vivado_hls_path,
+                          header_files=header_files, force_rebuild=force_rebuild)
 
 def parse_c2c_md(file_path):
     """
@@ -44,21 +76,29 @@ def parse_c2c_md(file_path):
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # 使用正则表达式分割示例
-        example_pattern = r'# (\d+)\s+.*?## Top Function\s+(.*?)\s+## 源代码\s+(.*?)\s+## 转写后代码\s+(.*?)(?=# \d+|\Z)'
-        matches = re.findall(example_pattern, content, re.DOTALL)
+        # 按"# 序号"标题切分示例块，再用partition逐段提取，避免正则回溯；
+        # 代码中非序号的"# "行并回上一个块
+        blocks = []
+        for block in ("\n" + content).split("\n# ")[1:]:
+            header, _, body = block.partition("\n")
+            fields = header.split()
+            if fields and fields[0].isdigit():
+                blocks.append([fields[0], body])
+            elif blocks:
+                blocks[-1][1] += "\n# " + block
         
-        for match in matches:
-            example_num = match[0].strip()
-            top_function = match[1].strip()
-            source_code = match[2].strip()
-            rewritten_code = match[3].strip()
+        for example_num, body in blocks:
+            _, found, rest = body.partition("## Top Function")
+            top_function, found_src, rest = rest.partition("## 源代码")
+            source_code, found_rw, rewritten_code = rest.partition("## 转写后代码")
+            if not (found and found_src and found_rw):
+                continue
             
             examples.append({
                 'number': example_num,
-                'top_function': top_function,
-                'source_code': source_code,
-                'rewritten_code': rewritten_code
+                'top_function': top_function.strip(),
+                'source_code': source_code.strip(),
+                'rewritten_code': rewritten_code.strip()
             })
         
         return examples
@@ -67,13 +107,50 @@ def parse_c2c_md(file_path):
         print(f"解析c2c.md文件时出错: {e}")
         return []
 
-def verify_example(example, vivado_hls_path=None):
+def _verify_cached(code_str, top_function, vivado_hls_path=None, header_files=None, force_rebuild=False):
+    """
+    带缓存的verify_hls_code，相同代码、顶层函数和头文件只综合一次
+    """
+    parts = [top_function, code_str]
+    for name, content in sorted((header_files or {}).items()):
+        parts += [name, content]
+    key = hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+    with _HLS_RESULT_LOCK:
+        future = _HLS_RESULT_CACHE.get(key)
+        owner = future is None
+        if owner:
+            future = _HLS_RESULT_CACHE[key] = Future()
+    
+    if not owner:
+        return future.result()
+    
+    try:
+        result = verify_hls_code(
+            code_str,
+            top_function,
+            vivado_hls_path=vivado_hls_path,
+            header_files=header_files,
+            force_rebuild=force_rebuild
+        )
+    except BaseException as e:
+        # 综合过程出错时不缓存，等待中的调用同样收到该异常
+        with _HLS_RESULT_LOCK:
+            del _HLS_RESULT_CACHE[key]
+        future.set_exception(e)
+        raise
+    future.set_result(result)
+    return result
+
+def verify_example(example, vivado_hls_path=None, skip_source=False, fail_fast=False, force_rebuild=False):
     """
     验证单个示例
     
     :param example: 示例信息字典
     :param vivado_hls_path: Vivado HLS路径
-    :return: 验证结果
+    :param skip_source: 为True时跳过源代码验证，只检查转写后代码
+    :param fail_fast: 为True时源代码验证失败后不再验证转写后代码
+    :param force_rebuild: 为True时忽略磁盘上的综合结果缓存，强制重新综合
+    :return: 验证结果，跳过的检查项为None
     """
     print(f"\n\n========== 验证示例 #{example['number']} ==========")
     print(f"Top Function: {example['top_function']}")
@@ -81,49 +158,76 @@ def verify_example(example, vivado_hls_path=None):
     # 准备头文件
     header_files = None
     
-    # 验证源代码（期望不可综合）
-    print("\n--- 验证源代码（期望不可综合）---")
-    source_result = verify_hls_code(
-        example['source_code'], 
-        example['top_function'], 
-        vivado_hls_path=vivado_hls_path,
-        header_files=header_files
-    )
-    # 检查源代码是否不可综合
-    source_synthesizable = True if "timing" in source_result and source_result["timing"] else False
-    
-    if not source_synthesizable:
-        print("源代码验证结果: Pass (不可综合，符合预期)")
+    source_pass = None
+    if skip_source:
+        print("\n--- 跳过源代码验证 ---")
     else:
-        print("源代码验证结果: Fail (可综合，不符合预期)")
-    
-    # 验证转写后代码（期望可综合）
-    print("\n--- 验证转写后代码（期望可综合）---")
-    rewritten_result = verify_hls_code(
-        example['rewritten_code'], 
-        example['top_function'], 
-        vivado_hls_path=vivado_hls_path,
-        header_files=header_files
-    )
-    print_result(rewritten_result)
-    # 检查转写后代码是否可综合
-    rewritten_synthesizable = True if "timing" in rewritten_result and rewritten_result["timing"] else False
-    
-    if rewritten_synthesizable:
-        print("转写后代码验证结果: Pass (可综合，符合预期)")
+        # 验证源代码（期望不可综合）
+        print("\n--- 验证源代码（期望不可综合）---")
+        source_result = _verify_cached(
+            example['source_code'], 
+            example['top_function'], 
+            vivado_hls_path=vivado_hls_path,
+            header_files=header_files,
+            force_rebuild=force_rebuild
+        )
+        # 检查源代码是否不可综合
+        source_synthesizable = bool(source_result.get("timing"))
+        source_pass = not source_synthesizable
+        
+        if not source_synthesizable:
+            print("源代码验证结果: Pass (不可综合，符合预期)")
+        else:
+            print("源代码验证结果: Fail (可综合，不符合预期)")
+    
+    rewritten_pass = None
+    if fail_fast and source_pass is False:
+        print("\n--- 源代码验证失败，跳过转写后代码验证 ---")
     else:
-        print("转写后代码验证结果: Fail (不可综合，不符合预期)")
+        # 验证转写后代码（期望可综合）
+        print("\n--- 验证转写后代码（期望可综合）---")
+        rewritten_result = _verify_cached(
+            example['rewritten_code'], 
+            example['top_function'], 
+            vivado_hls_path=vivado_hls_path,
+            header_files=header_files,
+            force_rebuild=force_rebuild
+        )
+        print_result(rewritten_result)
+        # 检查转写后代码是否可综合
+        rewritten_synthesizable = bool(rewritten_result.get("timing"))
+        rewritten_pass = rewritten_synthesizable
+        
+        if rewritten_synthesizable:
+            print("转写后代码验证结果: Pass (可综合，符合预期)")
+        else:
+            print("转写后代码验证结果: Fail (不可综合，不符合预期)")
     
     # 返回总体验证结果
     return {
         'number': example['number'],
         'top_function': example['top_function'],
-        'source_pass': not source_synthesizable,
-        'rewritten_pass': rewritten_synthesizable,
-        'overall_pass': not source_synthesizable and rewritten_synthesizable
+        'source_pass': source_pass,
+        'rewritten_pass': rewritten_pass,
+        'overall_pass': source_pass is not False and rewritten_pass is True
     }
 
-def verify_all_examples(c2c_md_path, vivado_hls_path=None, start_index=1, end_index=-1):
+def _verify_in_worker(stdout, example, vivado_hls_path=None, skip_source=False, fail_fast=False,
+                      force_rebuild=False):
+    """
+    在线程池中验证单个示例，输出缓存在本线程中
+    :return: (验证结果, 该示例的全部输出)
+    """
+    stdout.start()
+    try:
+        result = verify_example(example, vivado_hls_path, skip_source=skip_source, fail_fast=fail_fast,
+                                force_rebuild=force_rebuild)
+    finally:
+        output = stdout.stop()
+    return result, output
+
+def verify_all_examples(c2c_md_path, vivado_hls_path=None, start_index=1, end_index=-1, max_workers=None,
+                        skip_source=False, fail_fast=False, force_rebuild=False):
     """
     验证c2c.md中的所有示例
     
@@ -131,7 +235,11 @@ def verify_all_examples(c2c_md_path, vivado_hls_path=None, start_index=1, end_in
     :param vivado_hls_path: Vivado HLS路径
     :param start_index: 开始验证的示例索引（从1开始）
     :param end_index: 结束验证的示例索引（包含），默认为-1表示验证到最后
-    :return: 验证结果列表
+    :param max_workers: 并行验证的线程数，默认为CPU核数的一半
+    :param skip_source: 为True时跳过源代码验证，只检查转写后代码
+    :param fail_fast: 为True时源代码验证失败后不再验证转写后代码
+    :param force_rebuild: 为True时忽略磁盘上的综合结果缓存，强制重新综合
+    :return: 验证结果列表，按示例序号排序
     """
     examples = parse_c2c_md(c2c_md_path)
     
@@ -155,10 +263,26 @@ def verify_all_examples(c2c_md_path, vivado_hls_path=None, start_index=1, end_in
     else:
         print(f"找到 {len(examples)} 个示例，将验证索引范围在 [{start_index}, {end_index}] 内的 {len(filtered_examples)} 个示例")
     
+    # 耗时集中在Vivado HLS子进程上，用线程池并行提交即可
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 2) // 2)
+    
+    # 每个示例的输出在其完成后整体打印
     results = []
-    for example in filtered_examples:
-        result = verify_example(example, vivado_hls_path)
-        results.append(result)
+    stdout = _ThreadBufferedStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_verify_in_worker, stdout, example, vivado_hls_path,
+                                       skip_source, fail_fast, force_rebuild)
+                       for example in filtered_examples]
+            for future in as_completed(futures):
+                result, output = future.result()
+                print(output, end="")
+                results.append(result)
+    finally:
+        sys.stdout = stdout._stream
+    results.sort(key=lambda r: int(r['number']))
     
     # 打印总结
     print("\n\n========== 验证结果总结 ==========")
@@ -180,6 +304,10 @@ if __name__ == "__main__":
     parser.add_argument('-e', '--end', type=int, default=-1, help='结束验证的示例索引（包含），默认为-1表示验证到最后')
     parser.add_argument('-p', '--path', type=str, help='Vivado HLS路径')
     parser.add_argument('-f', '--file', type=str, default="../HLS-data/c2c/c2c.md", help='c2c.md文件路径')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行验证的线程数，默认为CPU核数的一半')
+    parser.add_argument('--skip-source', action='store_true', help='跳过源代码验证，只检查转写后代码')
+    parser.add_argument('--fail-fast', action='store_true', help='源代码验证失败后不再验证转写后代码')
+    parser.add_argument('--force-rebuild', action='store_true', help='忽略综合结果缓存，强制重新综合')
     args = parser.parse_args()
     
     # c2c.md文件路径
@@ -188,15 +316,15 @@ if __name__ == "__main__":
     # 检查文件是否存在
     if not os.path.exists(c2c_md_path):
         print(f"错误: 找不到文件 {c2c_md_path}")
-        # 尝试查找文件
-        for root, dirs, files in os.walk(".."):
-            for file in files:
-                if file == "c2c.md":
-                    c2c_md_path = os.path.join(root, file)
-                    print(f"找到文件: {c2c_md_path}")
-                    break
+        # 尝试查找文件，找到第一个即停止
+        found = next(Path("..").rglob("c2c.md"), None)
+        if found:
+            c2c_md_path = str(found)
+            print(f"找到文件: {c2c_md_path}")
     start_time = time.time()
     # 验证指定范围内的示例
-    verify_all_examples(c2c_md_path, vivado_hls_path=args.path, start_index=args.index, end_index=args.end)
+    verify_all_examples(c2c_md_path, vivado_hls_path=args.path, start_index=args.index, end_index=args.end,
+                        max_workers=args.jobs, skip_source=args.skip_source, fail_fast=args.fail_fast,
+                        force_rebuild=args.force_rebuild)
     end_time = time.time()
     print(f"验证完成，用时 {round(end_time - start_time, 2)} 秒")
\ No newline at end of file
@@ -1,8 +1,9 @@
 from hls_script import hls_evaluation, print_result
-import os
+import argparse
 
 def verify_hls_code(code_str: str, top_function: str = "top", target_device: str = "xczu7ev-ffvc1156-2-e", 
-                  clock_period: float = 5.0, vivado_hls_path: str = None, header_files: dict = None) -> dict:
+                  clock_period: float = 5.0, vivado_hls_path: str = None, header_files: dict = None,
+                  force_rebuild: bool = False) -> dict:
     """
     验证HLS代码
     
@@ -12,23 +13,18 @@ def verify_hls_code(code_str: str, top_function: str = "top", target_device: str
     :param clock_period: 时钟周期（ns）
     :param vivado_hls_path: Vivado HLS路径
     :param header_files: 头文件字典，格式为 {"文件名": "文件内容"}
+    :param force_rebuild: 为True时忽略综合结果缓存，强制重新综合
     :return: HLS评估结果
     """
-    # 创建build目录
-    build_dir = os.path.join(os.getcwd(), "build")
-    os.makedirs(build_dir, exist_ok=True)
-    
-    # 如果提供了头文件，先写入头文件
-    if header_files:
-        for filename, content in header_files.items():
-            header_path = os.path.join(build_dir, filename)
-            with open(header_path, "w") as f:
-                f.write(content)
-    
-    # 调用hls_evaluation函数进行评估
-    return hls_evaluation(code_str, top_function, target_device, clock_period, vivado_hls_path)
+    # 调用hls_evaluation函数进行评估，头文件与源文件写入同一个构建目录
+    return hls_evaluation(code_str, top_function, target_device, clock_period, vivado_hls_path,
+                          header_files=header_files, force_rebuild=force_rebuild)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='验证单个HLS代码示例')
+    parser.add_argument('--force-rebuild', action='store_true', help='忽略综合结果缓存，强制重新综合')
+    args = parser.parse_args()
+    
     # 测试带有未知循环次数的函数
     code_str = """
 #include <stdexcept>
@@ -57,5 +53,5 @@ void my_array(){
     test_function = "my_array"
     
     # 运行测试
-    result = verify_hls_code(test_code, test_function)
+    result = verify_hls_code(test_code, test_function, force_rebuild=args.force_rebuild)
     print_result(result) 
\ No newline at end of file